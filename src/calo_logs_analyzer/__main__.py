@@ -16,6 +16,9 @@ def main():
                         help="Default decimal places for rounding when currency is unknown (default: 2)")
     parser.add_argument("--excel-columns", default="accounting",
                         help="Columns preset for the Excel ledger sheet: 'accounting', 'full' or path to a JSON file")
+    parser.add_argument("--excel-constant-memory", action="store_true", default=None,
+                        help="Write the Excel report in low-memory streaming mode "
+                             "(default: only for very large ledgers)")
     args = parser.parse_args()
 
     run_analysis(
@@ -25,7 +28,8 @@ def main():
         log_level=args.log_level,
         tolerance=args.tolerance,
         decimals=args.decimals,
-        excel_columns=args.excel_columns
+        excel_columns=args.excel_columns,
+        excel_constant_memory=args.excel_constant_memory
     )
 
 
@@ -1,11 +1,22 @@
 import logging
-from typing import Any, Dict, List, Optional
+import re
+from typing import List, Optional, Union
 
 import numpy as np
 import pandas as pd
 
+from src.calo_logs_analyzer.compute import shift_within_groups
+
 logger = logging.getLogger(__name__)
 
+# Ledger columns carried onto every anomaly row
+BASE_COLUMNS = ["timestamp", "userId", "id", "type", "source", "action", "amount", "oldBalance", "newBalance"]
+ANOMALY_COLUMNS = BASE_COLUMNS + ["anomalyType", "details"]
+
+INVALID_ACTION_RE = re.compile(r"INVAI?LID", re.IGNORECASE)  # INVALID and the INVAILID typo
+MANUAL_SOURCE_RE = re.compile(r"MANUAL", re.IGNORECASE)
+BLANK_RE = re.compile(r"\s*")
+
 
 def first_digit(val: float) -> Optional[int]:
     """
@@ -20,6 +31,25 @@ def first_digit(val: float) -> Optional[int]:
     return None
 
 
+def _add_anomalies(
+        pieces: List[pd.DataFrame],
+        df: pd.DataFrame,
+        mask: pd.Series,
+        anomaly_type: str,
+        details: Union[str, pd.Series],
+) -> None:
+    """
+    Append the rows of ``df`` selected by ``mask`` to ``pieces`` as anomaly rows.
+    ``details`` is either a constant message or a Series aligned to the selected rows.
+    """
+    if not mask.any():
+        return
+    piece = df.loc[mask, BASE_COLUMNS].copy()
+    piece["anomalyType"] = anomaly_type
+    piece["details"] = details
+    pieces.append(piece)
+
+
 def detect_anomalies(
         ledger: pd.DataFrame,
         *,
@@ -46,201 +76,85 @@ def detect_anomalies(
         oldBalance, newBalance, anomalyType, details).
     """
     if ledger is None or ledger.empty:
-        return pd.DataFrame(columns=[
-            "timestamp", "userId", "id", "type", "source", "action", "amount", "oldBalance",
-            "newBalance", "anomalyType", "details"
-        ])
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
     df = ledger.copy()
     # Ensure timestamp is datetime64[ns, UTC]
     if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
         df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
-    # Sort for sequential checks
-    df = df.sort_values(["userId", "timestamp", "id"])
+    # Sort for sequential checks; a fresh index keeps the label-aligned assignments below
+    # valid when the ledger carries duplicate labels (e.g. concatenated ledgers)
+    df = df.sort_values(["userId", "timestamp", "id"]).reset_index(drop=True)
 
-    anomalies: List[Dict[str, Any]] = []
+    pieces: List[pd.DataFrame] = []
 
     # Invalid actions (typos)
-    invalid_mask = df["action"].astype(str).str.contains("INVALID|INVAILID", case=False, na=False)
-    for _, row in df[invalid_mask].iterrows():
-        anomalies.append({
-            "timestamp": row["timestamp"],
-            "userId": row["userId"],
-            "id": row["id"],
-            "type": row["type"],
-            "source": row["source"],
-            "action": row["action"],
-            "amount": row["amount"],
-            "oldBalance": row["oldBalance"],
-            "newBalance": row["newBalance"],
-            "anomalyType": "InvalidAction",
-            "details": "Action contains 'INVALID'",
-        })
+    invalid_mask = df["action"].astype("string").str.contains(INVALID_ACTION_RE, na=False)
+    _add_anomalies(pieces, df, invalid_mask, "InvalidAction", "Action contains 'INVALID'")
 
     # MAD-based spikes per user/type on amount
-    grouped = df.groupby(["userId", "type"])
-    for (uid, typ), grp in grouped:
-        amounts = grp["amount"].astype(float)
-        if len(amounts) == 0:
-            continue
-        median = np.nanmedian(amounts)
-        mad = np.nanmedian(np.abs(amounts - median))
-        if mad == 0 or np.isnan(mad):
-            continue
-        # MAD z-score
-        mad_z = np.abs((amounts - median) / mad)
-        spike_mask = mad_z >= mad_threshold
-        for _, row in grp[spike_mask].iterrows():
-            anomalies.append({
-                "timestamp": row["timestamp"],
-                "userId": row["userId"],
-                "id": row["id"],
-                "type": row["type"],
-                "source": row["source"],
-                "action": row["action"],
-                "amount": row["amount"],
-                "oldBalance": row["oldBalance"],
-                "newBalance": row["newBalance"],
-                "anomalyType": "MADSpike",
-                "details": f"MAD z-score {float(np.abs((row['amount'] - median) / mad)):.2f} >= {mad_threshold}",
-            })
+    amounts = df["amount"].astype(float, copy=False)
+    # Hash the (userId, type) pairs once; both median passes group on the integer codes
+    # (rows with a missing key get NaN and are left out, as in a plain groupby)
+    group_ids = df.groupby(["userId", "type"], sort=False, observed=True).ngroup()
+    df["amountMedian"] = amounts.groupby(group_ids).transform("median")
+    mad = (amounts - df["amountMedian"]).abs().groupby(group_ids).transform("median")
+    # Groups with a zero (or undefined) MAD carry no spread to score against
+    df["madZ"] = ((amounts - df["amountMedian"]) / mad).abs().where((mad > 0) & mad.notna())
+    mad_z = df["madZ"]
+    spike_mask = mad_z >= mad_threshold
+    _add_anomalies(pieces, df, spike_mask, "MADSpike",
+                   "MAD z-score " + mad_z[spike_mask].map("{:.2f}".format) + f" >= {mad_threshold}")
 
     # Duplicate transaction ids per user
     dup_id_mask = df.duplicated(subset=["userId", "id"], keep=False)
-    for _, row in df[dup_id_mask].iterrows():
-        anomalies.append({
-            "timestamp": row["timestamp"],
-            "userId": row["userId"],
-            "id": row["id"],
-            "type": row["type"],
-            "source": row["source"],
-            "action": row["action"],
-            "amount": row["amount"],
-            "oldBalance": row["oldBalance"],
-            "newBalance": row["newBalance"],
-            "anomalyType": "DuplicateTxId",
-            "details": "Duplicate transaction id for user",
-        })
+    _add_anomalies(pieces, df, dup_id_mask, "DuplicateTxId", "Duplicate transaction id for user")
 
     for col in ["type", "source", "action"]:
         # blank = NaN OR all-whitespace
-        blank_mask = df[col].isna() | (df[col].astype(str).str.strip() == "")
-        if blank_mask.any():
-            for _, row in df[blank_mask].iterrows():
-                anomalies.append({
-                    "timestamp": row["timestamp"],
-                    "userId": row["userId"],
-                    "id": row["id"],
-                    "type": row.get("type"),
-                    "source": row.get("source"),
-                    "action": row.get("action"),
-                    "amount": row.get("amount"),
-                    "oldBalance": row.get("oldBalance"),
-                    "newBalance": row.get("newBalance"),
-                    "anomalyType": "MissingField",
-                    "details": f"{col} is blank",
-                })
+        blank_mask = df[col].astype("string").str.fullmatch(BLANK_RE, na=True)
+        _add_anomalies(pieces, df, blank_mask, "MissingField", f"{col} is blank")
 
     # Rapid repeated manual deductions within dup_time_window
-    df["prevTimestamp"] = df.groupby(["userId", "type", "amount"])["timestamp"].shift(1)
+    # Stable re-sort keeps the timestamp order within each (userId, type, amount) run
+    repeat_keys = ["userId", "type", "amount"]
+    by_amount = df[repeat_keys + ["timestamp"]].sort_values(repeat_keys, kind="stable")
+    df["prevTimestamp"] = shift_within_groups(by_amount["timestamp"], *(by_amount[c] for c in repeat_keys))
     rapid_mask = (
             (df["type"] == "DEBIT") &
-            (df["source"].astype(str).str.contains("MANUAL", case=False, na=False)) &
+            (df["source"].astype("string").str.contains(MANUAL_SOURCE_RE, na=False)) &
             (df["prevTimestamp"].notna()) &
             ((df["timestamp"] - df["prevTimestamp"]).dt.total_seconds() <= dup_time_window)
     )
-    for _, row in df[rapid_mask].iterrows():
-        anomalies.append({
-            "timestamp": row["timestamp"],
-            "userId": row["userId"],
-            "id": row["id"],
-            "type": row["type"],
-            "source": row["source"],
-            "action": row["action"],
-            "amount": row["amount"],
-            "oldBalance": row["oldBalance"],
-            "newBalance": row["newBalance"],
-            "anomalyType": "RapidManualDeduction",
-            "details": f"Repeated manual {row['type']} within {dup_time_window}s",
-        })
+    _add_anomalies(pieces, df, rapid_mask, "RapidManualDeduction",
+                   f"Repeated manual DEBIT within {dup_time_window}s")
 
     # Continuity breaks flagged in ledger
     if "continuityBreak" in df.columns:
         cont_mask = df["continuityBreak"] == True
-        for _, row in df[cont_mask].iterrows():
-            anomalies.append({
-                "timestamp": row["timestamp"],
-                "userId": row["userId"],
-                "id": row["id"],
-                "type": row["type"],
-                "source": row["source"],
-                "action": row["action"],
-                "amount": row["amount"],
-                "oldBalance": row["oldBalance"],
-                "newBalance": row["newBalance"],
-                "anomalyType": "ContinuityBreak",
-                "details": "Old balance does not match previous new balance",
-            })
+        _add_anomalies(pieces, df, cont_mask, "ContinuityBreak", "Old balance does not match previous new balance")
 
     # Balance mismatches flagged in ledger
     if "balanceMismatch" in df.columns:
         mismatch_mask = df["balanceMismatch"] == True
-        for _, row in df[mismatch_mask].iterrows():
-            anomalies.append({
-                "timestamp": row["timestamp"],
-                "userId": row["userId"],
-                "id": row["id"],
-                "type": row["type"],
-                "source": row["source"],
-                "action": row["action"],
-                "amount": row["amount"],
-                "oldBalance": row["oldBalance"],
-                "newBalance": row["newBalance"],
-                "anomalyType": "BalanceMismatch",
-                "details": f"Expected {row['expectedNewBalance']} != Actual {row['newBalance']}",
-            })
+        mismatched = df.loc[mismatch_mask]
+        _add_anomalies(pieces, df, mismatch_mask, "BalanceMismatch",
+                       "Expected " + mismatched["expectedNewBalance"].astype(str)
+                       + " != Actual " + mismatched["newBalance"].astype(str))
 
     # Large gaps or bursts
-    df["prevTs"] = df.groupby("userId")["timestamp"].shift(1)
+    df["prevTs"] = shift_within_groups(df["timestamp"], df["userId"])
     df["gapSeconds"] = (df["timestamp"] - df["prevTs"]).dt.total_seconds()
     gap_mask = df["gapSeconds"].notna() & (df["gapSeconds"] < 1)
-    for _, row in df[gap_mask].iterrows():
-        anomalies.append({
-            "timestamp": row["timestamp"],
-            "userId": row["userId"],
-            "id": row["id"],
-            "type": row["type"],
-            "source": row["source"],
-            "action": row["action"],
-            "amount": row["amount"],
-            "oldBalance": row["oldBalance"],
-            "newBalance": row["newBalance"],
-            "anomalyType": "Burst",
-            "details": "Transactions within <1s of each other",
-        })
+    _add_anomalies(pieces, df, gap_mask, "Burst", "Transactions within <1s of each other")
 
     # Currency consistency per user
-    currency_counts = df.groupby("userId")["currency"].nunique()
+    currency_counts = df.groupby("userId", observed=True)["currency"].nunique()
     mixed_users = currency_counts[currency_counts > 1].index.tolist()
-    for _, row in df[df["userId"].isin(mixed_users)].iterrows():
-        anomalies.append({
-            "timestamp": row["timestamp"],
-            "userId": row["userId"],
-            "id": row["id"],
-            "type": row["type"],
-            "source": row["source"],
-            "action": row["action"],
-            "amount": row["amount"],
-            "oldBalance": row["oldBalance"],
-            "newBalance": row["newBalance"],
-            "anomalyType": "CurrencyMismatch",
-            "details": "Multiple currencies detected for same user",
-        })
-
-    if not anomalies:
-        return pd.DataFrame(columns=[
-            "timestamp", "userId", "id", "type", "source", "action", "amount", "oldBalance",
-            "newBalance", "anomalyType", "details"
-        ])
-    anomalies_df = pd.DataFrame(anomalies)
+    _add_anomalies(pieces, df, df["userId"].isin(mixed_users), "CurrencyMismatch",
+                   "Multiple currencies detected for same user")
+
+    if not pieces:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    anomalies_df = pd.concat(pieces, ignore_index=True)
     anomalies_df = anomalies_df.sort_values("timestamp")
     return anomalies_df
@@ -1,15 +1,47 @@
 import logging
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Decimal places of the integer working unit used for balance arithmetic. Parser
+# output carries at most four decimals, so amounts are held exactly and sums are
+# only rounded once, when quantized to the currency precision.
+WORK_DECIMALS = 6
+
+# Largest magnitude, in work units, that balance arithmetic may reach without
+# overflowing int64.
+_MAX_UNITS = float(np.iinfo(np.int64).max)
+
+
+def _round_half_up(units: np.ndarray, drop: np.ndarray) -> np.ndarray:
+    """
+    Drop ``drop`` trailing decimal digits from integer ``units``, rounding ties
+    away from zero (Decimal ROUND_HALF_UP semantics).
+    """
+    factor = np.power(10, drop).astype(np.int64)
+    mag = (np.abs(units) + factor // 2) // factor
+    return np.where(units < 0, -mag, mag)
+
+
+def shift_within_groups(values: pd.Series, *keys: pd.Series) -> pd.Series:
+    """
+    Equivalent of ``values.groupby(list(keys)).shift(1)`` for data already sorted so that
+    equal keys are contiguous. Group starts are found by comparing adjacent keys, so no
+    hashing pass is needed; rows with a missing key get no previous value, as with groupby.
+    """
+    same_group = np.ones(max(len(values) - 1, 0), dtype=bool)
+    for key in keys:
+        arr = key.to_numpy()
+        same_group &= (arr[1:] == arr[:-1]) & ~pd.isna(arr[1:])
+    group_start = np.concatenate(([True], ~same_group))[:len(values)]
+    return values.shift(1).mask(group_start)
+
 
 def build_ledger(
-        events: List[Dict[str, Any]],
+        events: pd.DataFrame | List[Dict[str, Any]],
         *,
         decimals: int = 2,
         tolerance: float = 0.005,
@@ -21,8 +53,8 @@ def build_ledger(
 
     Parameters
     ----------
-    events : list of dict
-        Parsed events from the parser.
+    events : DataFrame or list of dict
+        Parsed events from the parser, one row (or dict) per event.
     decimals : int, default 2
         Default number of decimal places to round to when currency not recognised.
     tolerance : float, default 0.005
@@ -53,140 +85,100 @@ def build_ledger(
             tx[col] = pd.to_numeric(tx[col], errors="coerce")
 
     # Determine decimals for each row based on currency
-    def get_decimals(cur: str) -> int:
-        cur = (cur or "").upper()
-        return currency_decimals.get(cur, decimals)
-
-    # Precompute quantize exponents for each currency
-    quant_exps: Dict[int, Decimal] = {}
-
-    def get_quant(dps: int) -> Decimal:
-        if dps not in quant_exps:
-            quant_exps[dps] = Decimal("1").scaleb(-dps)
-        return quant_exps[dps]
-
-    # row-wise computation using Decimal
-    expected_list = []
-    mismatch_list = []
-    overdraft_list = []
-    overdraft_reason = []
-    new_filled_list = []
-    old_decimal_list = []
-    new_decimal_list = []
-    sug_adj_list = []
-
-    for idx, row in tx.iterrows():
-        cur = row.get("currency") or ""
-        dps = get_decimals(cur)
-        quant = get_quant(dps)
-
-        # Convert to Decimal safely
-        def to_dec(x):
-            if x is None or (isinstance(x, float) and np.isnan(x)):
-                return None
-            try:
-                return Decimal(str(x))
-            except (InvalidOperation, ValueError):
-                return None
-
-        amount = to_dec(row.get("amount"))
-        vat = to_dec(row.get("vat"))
-        old_bal = to_dec(row.get("oldBalance"))
-        new_bal = to_dec(row.get("newBalance"))
-        amt = amount or Decimal(0)
-        v = vat or Decimal(0)
-        old_b = old_bal or Decimal(0)
-
-        # Compute expected new balance
-        if str(row.get("type")).upper() == "CREDIT":
-            exp_new = old_b + (amt - v)
-        elif str(row.get("type")).upper() == "DEBIT":
-            exp_new = old_b - (amt - v)
-        else:
-            exp_new = None
-
-        # Quantize expected
-        if exp_new is not None:
-            exp_new_q = exp_new.quantize(quant, rounding=ROUND_HALF_UP)
-        else:
-            exp_new_q = None
-        expected_list.append(float(exp_new_q) if exp_new_q is not None else np.nan)
-
-        # Quantize actual new balance
-        if new_bal is not None:
-            new_bal_q = new_bal.quantize(quant, rounding=ROUND_HALF_UP)
-            new_decimal_list.append(new_bal_q)
-        else:
-            new_bal_q = None
-            new_decimal_list.append(None)
-
-        old_decimal_list.append(old_b.quantize(quant, rounding=ROUND_HALF_UP) if old_bal is not None else None)
-
-        # Balance mismatch determination
-        if exp_new_q is not None and new_bal_q is not None:
-            diff = abs(exp_new_q - new_bal_q)
-            mismatch = diff > Decimal(str(tolerance))
-        else:
-            mismatch = False
-        mismatch_list.append(mismatch)
-
-        # Overdraft reason and flag
-        reason = None
-        expected_neg = False
-        actual_neg = False
-        if exp_new_q is not None and exp_new_q < 0:
-            expected_neg = True
-            reason = "expected<0"
-        if new_bal_q is not None and new_bal_q < 0:
-            actual_neg = True
-            reason = "actual<0"
-        if expected_neg and actual_neg:
-            reason = "expected balance < 0, actual balance < 0"
-        overdraft_list.append(reason is not None)
-        overdraft_reason.append(reason)
-
-        # newBalanceFilled: use new_bal_q if present, else expected
-        if new_bal_q is not None:
-            nf = new_bal_q
-        elif exp_new_q is not None:
-            nf = exp_new_q
-        else:
-            nf = None
-        new_filled_list.append(nf)
-
-        # Suggested adjustment
-        if mismatch and exp_new_q is not None and new_bal_q is not None:
-            sug = (exp_new_q - new_bal_q).quantize(quant, rounding=ROUND_HALF_UP)
-            sug_adj_list.append(float(sug))
+    currencies = tx["currency"] if "currency" in tx.columns else pd.Series("", index=tx.index)
+    # Look decimals up once per distinct currency; missing currencies (code -1) pick the
+    # trailing default entry
+    codes, uniques = pd.factorize(currencies)
+    dps_table = [currency_decimals.get(str(c or "").upper(), decimals) for c in uniques] + [decimals]
+    dps = np.array(dps_table, dtype=np.int64)[codes]
+    work_dps = max(WORK_DECIMALS, int(dps.max()))
+    drop = work_dps - dps
+    scale = np.power(10.0, dps)
+
+    def to_units(col: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Missing or non-finite values count as 0 units and are reported absent
+        if col in tx.columns:
+            vals = tx[col].to_numpy(dtype=float)
         else:
-            sug_adj_list.append(0.0)
-
-    tx = tx.copy()
-    tx["expectedNewBalance"] = expected_list
-    tx["balanceMismatch"] = mismatch_list
-    tx["overdraft"] = overdraft_list
-    tx["overdraftReason"] = overdraft_reason
-    tx["_newBalanceFilled"] = new_filled_list
-    tx["_oldBalanceDec"] = old_decimal_list
-    tx["_newBalanceDec"] = new_decimal_list
-    tx["suggestedAdjustment"] = sug_adj_list
+            vals = np.full(len(tx), np.nan)
+        present = np.isfinite(vals)
+        scaled = np.where(present, vals, 0.0) * 10.0 ** work_dps
+        if np.abs(scaled).max(initial=0.0) >= _MAX_UNITS:
+            raise ValueError(
+                f"{col} value too large for {work_dps}-decimal integer balance arithmetic: "
+                f"max {np.abs(vals[present]).max()}, limit {_MAX_UNITS / 10 ** work_dps:.6g}"
+            )
+        return np.rint(scaled).astype(np.int64), present
+
+    amount, _ = to_units("amount")
+    vat, _ = to_units("vat")
+    old_bal, has_old = to_units("oldBalance")
+    new_bal, has_new = to_units("newBalance")
+
+    # Compute expected new balance; other transaction types have no expectation
+    if "type" in tx.columns:
+        types = tx["type"].astype(str).str.upper().to_numpy()
+        sign = np.select([types == "CREDIT", types == "DEBIT"], [1, -1], 0)
+    else:
+        sign = np.zeros(len(tx), dtype=np.int64)
+    has_exp = sign != 0
+
+    # old + sign * (amount - vat) must fit too; one extra unit of the working scale covers
+    # float error in the bound and the rounding headroom of the quantization
+    reach = np.abs(old_bal.astype(float)) + has_exp * (np.abs(amount.astype(float)) + np.abs(vat.astype(float)))
+    if reach.max(initial=0.0) + 10.0 ** work_dps >= _MAX_UNITS:
+        raise ValueError(
+            f"Expected balance too large for {work_dps}-decimal integer balance arithmetic: "
+            f"|oldBalance| + |amount| + |vat| reaches {reach.max() / 10 ** work_dps:.6g}, "
+            f"limit {_MAX_UNITS / 10 ** work_dps:.6g}"
+        )
+
+    # Quantize to the currency precision (units of 10**-dps)
+    exp_q = _round_half_up(old_bal + sign * (amount - vat), drop)
+    new_q = _round_half_up(new_bal, drop)
+    old_q = _round_half_up(old_bal, drop)
+
+    expected = np.where(has_exp, exp_q / scale, np.nan)
+
+    # Balance mismatch determination
+    gap = (exp_q - new_q) / scale
+    mismatch = has_exp & has_new & (np.round(np.abs(gap), 9) > tolerance)
+
+    # Overdraft reason and flag
+    expected_neg = has_exp & (exp_q < 0)
+    actual_neg = has_new & (new_q < 0)
+    reason = np.full(len(tx), None, dtype=object)
+    reason[expected_neg] = "expected<0"
+    reason[actual_neg] = "actual<0"
+    reason[expected_neg & actual_neg] = "expected balance < 0, actual balance < 0"
+
+    tx["expectedNewBalance"] = expected
+    tx["balanceMismatch"] = mismatch
+    tx["overdraft"] = expected_neg | actual_neg
+    tx["overdraftReason"] = reason
+    tx["suggestedAdjustment"] = np.where(mismatch, gap, 0.0)
+
+    # newBalanceFilled: actual new balance if present, else expected. Both it and the
+    # rounded old balance are kept as quantized values in work units (nullable Int64)
+    # so the continuity gap is computed exactly, even for large balances.
+    to_work = np.power(10, drop).astype(np.int64)
+    tx["_newBalanceUnits"] = pd.arrays.IntegerArray(
+        np.where(has_new, new_q, exp_q) * to_work, ~(has_new | has_exp))
+    tx["_oldBalanceUnits"] = pd.arrays.IntegerArray(old_q * to_work, ~has_old)
 
     # Determine continuity break per user with tolerance
     tx = tx.sort_values(["userId", "timestamp", "id", "messageId"])
-    tx["prevNewBalanceFilled"] = tx.groupby("userId")["_newBalanceFilled"].shift(1)
-
-    def cont_break(row) -> bool:
-        ob_dec = row["_oldBalanceDec"]
-        prev_nf = to_dec(row["prevNewBalanceFilled"])
-        if ob_dec is None or prev_nf is None:
-            return False
-        diff = abs(ob_dec - prev_nf)
-        return diff > Decimal(str(tolerance))
+    prev_units = shift_within_groups(tx["_newBalanceUnits"], tx["userId"])
+    tx["prevNewBalanceFilled"] = (prev_units / 10 ** work_dps).to_numpy(dtype=float, na_value=np.nan)
 
-    tx["continuityBreak"] = tx.apply(cont_break, axis=1)
+    # A missing value on either side (missing balance or first row per user) is no break
+    old_units = tx["_oldBalanceUnits"]
+    both = (old_units.notna() & prev_units.notna()).to_numpy()
+    diff = np.abs(old_units.to_numpy(dtype=np.int64, na_value=0) - prev_units.to_numpy(dtype=np.int64, na_value=0))
+    tx["continuityBreak"] = both & (diff > round(tolerance * 10 ** work_dps))
 
     # Cleanup temporary columns
-    tx.drop(columns=["_newBalanceFilled", "_oldBalanceDec", "_newBalanceDec"], inplace=True)
+    tx.drop(columns=["_newBalanceUnits", "_oldBalanceUnits"], inplace=True)
     return tx
 
 
@@ -226,21 +218,28 @@ def summarize(ledger: pd.DataFrame) -> Dict[str, Any]:
             "by_source": pd.DataFrame(),
             "overdrafts": pd.DataFrame(),
         }
+    # Split amounts into debit/credit columns so the per-user sums stay on the C groupby path
+    types = ledger["type"].to_numpy()
+    amounts = ledger["amount"].to_numpy(dtype=float)
+    flows = ledger.assign(
+        _debit=np.where(types == "DEBIT", amounts, 0.0),
+        _credit=np.where(types == "CREDIT", amounts, 0.0),
+    )
     totals = {
         "transactions": int(len(ledger)),
         "unique_users": int(ledger["userId"].nunique()),
         "total_debit": float(ledger.loc[ledger["type"] == "DEBIT", "amount"].sum()),
         "total_credit": float(ledger.loc[ledger["type"] == "CREDIT", "amount"].sum())
     }
-    by_user = ledger.groupby("userId").agg(
+    by_user = flows.groupby("userId", observed=True).agg(
         tx_count=("id", "count"),
-        total_debit=("amount", lambda s: float(s[ledger.loc[s.index, "type"] == "DEBIT"].sum())),
-        total_credit=("amount", lambda s: float(s[ledger.loc[s.index, "type"] == "CREDIT"].sum())),
+        total_debit=("_debit", "sum"),
+        total_credit=("_credit", "sum"),
         overdrafts=("overdraft", "sum"),
         mismatches=("balanceMismatch", "sum"),
         continuity_breaks=("continuityBreak", "sum"),
     ).reset_index()
-    by_source = ledger.groupby(["source", "type"]).agg(total_amount=("amount", "sum"),
-                                                       tx_count=("id", "count")).reset_index()
+    by_source = ledger.groupby(["source", "type"], observed=True).agg(total_amount=("amount", "sum"),
+                                                                      tx_count=("id", "count")).reset_index()
     overdrafts = ledger[ledger["overdraft"] == True].copy()
     return {"totals": totals, "by_user": by_user, "by_source": by_source, "overdrafts": overdrafts}
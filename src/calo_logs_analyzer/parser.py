@@ -1,23 +1,42 @@
 import gzip
 import logging
+import mmap
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
 
 TS_RE = re.compile(r"^(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z)\s")
 BLOCK_START_RE = re.compile(r"Start syncing the balance\s*\{", re.IGNORECASE)
 PROC_MSG_RE = re.compile(r"INFO\s+Processing message\s+(?P<msgid>[a-f0-9-]{36})", re.IGNORECASE)
 SKIP_RE = re.compile(r"Skipping the balance sync for create subscription", re.IGNORECASE)
-
-# Capture simple key: value lines inside the transaction block (loose, single quotes tolerated)
-KV_LINE_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*:\s*(.+?)(?:,)?\s*$")
+# Literal core of the three line patterns above; locates candidate lines in raw file bytes
+EVENT_HINT_RE = re.compile(
+    rb"Processing message|Skipping the balance sync for create subscription|Start syncing the balance",
+    re.IGNORECASE,
+)
+BLOCK_SCAN_RE = re.compile(rb"[{}\n]")
+BRACE_RE = re.compile(r"[{}]")
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Capture simple key: value lines inside the transaction block (loose, single quotes tolerated).
+# Multiline so one finditer covers the whole block; [^\S\n] keeps matches within a line.
+KV_LINE_RE = re.compile(r"^[^\S\n]*([A-Za-z_]\w*)[^\S\n]*:[^\S\n]*(.+?)(?:,)?[^\S\n]*$", re.MULTILINE)
+TX_START_RE = re.compile(r"transaction\s*:\s*\{", re.IGNORECASE)
 
 MONEY_FIELDS = ("amount", "vat", "oldBalance", "newBalance", "paymentBalance")
 CURR_DECIMALS = {"SAR": 3, "BHD": 4}  # default will be 2 dp
 ZERO_TOL = 1e-9
 
+# Raw file contents handed to the scanner: decompressed bytes or a read-only mmap
+Buffer = Union[bytes, mmap.mmap]
+
 # module level logger
 logger = logging.getLogger(__name__)
 
@@ -27,7 +46,13 @@ def parse_iso(ts: str) -> datetime:
 
 
 def coerce_scalar(val: str):
-    v = val.strip()
+    return _coerce_stripped(val.strip())
+
+
+@lru_cache(maxsize=200_000)
+def _coerce_stripped(v: str):
+    # Cached: currencies, types, sources and true/false flags repeat across events, and
+    # unquoted non-numeric tokens would otherwise raise in both int() and float() each time
     # Strip enclosing quotes (single or double)
     if (v.startswith("'") and v.endswith("'")) or (v.startswith('"') and v.endswith('"')):
         return v[1:-1]
@@ -50,16 +75,14 @@ def coerce_scalar(val: str):
     return v
 
 
-def parse_transaction_block(lines: List[str]) -> Dict[str, Any]:
+def parse_transaction_block(content: str) -> Dict[str, Any]:
     """
     Extract the balanced 'transaction: { ... }' object and parse flat key: value pairs.
     This is robust to braces inside quoted strings (e.g., metadata JSON),
     because we scan until the *matching* closing brace instead of using a non-greedy regex.
     """
-    content = "\n".join(lines)
-
     # Find the literal start of 'transaction: {'
-    m = re.search(r"transaction\s*:\s*\{", content, re.IGNORECASE)
+    m = TX_START_RE.search(content)
     if not m:
         return {}
 
@@ -68,17 +91,16 @@ def parse_transaction_block(lines: List[str]) -> Dict[str, Any]:
     if start == -1:
         return {}
 
-    # Balanced-brace scan to the matching '}'
+    # Balanced-brace scan to the matching '}', visiting only the brace characters
     brace = 0
     end = None
-    for idx in range(start, len(content)):
-        ch = content[idx]
-        if ch == "{":
+    for mb in BRACE_RE.finditer(content, start):
+        if mb.group() == "{":
             brace += 1
-        elif ch == "}":
+        else:
             brace -= 1
             if brace == 0:
-                end = idx
+                end = mb.start()
                 break
 
     if end is None:
@@ -87,16 +109,10 @@ def parse_transaction_block(lines: List[str]) -> Dict[str, Any]:
 
     # Inner text of the transaction object, without the outer braces
     tblock_text = content[start + 1:end]
-    tblock = tblock_text.splitlines()
 
+    # '//' comment lines never match, since a key must start the line
     out: Dict[str, Any] = {}
-    for ln in tblock:
-        ln = ln.strip()
-        if not ln or ln.startswith("//"):
-            continue
-        m_kv = KV_LINE_RE.match(ln)
-        if not m_kv:
-            continue
+    for m_kv in KV_LINE_RE.finditer(tblock_text):
         key = m_kv.group(1)
         raw = m_kv.group(2).strip()
         # drop a trailing comma (already optional in regex, keep for safety)
@@ -134,7 +150,7 @@ def open_maybe_gz(path: str | Path, mode: str = "rt", encoding: str = "utf-8", e
     except FileNotFoundError:
         raise
 
-    is_gz = magic == b"\x1f\x8b"
+    is_gz = magic == GZIP_MAGIC
     if is_gz:
         return gzip.open(p, mode, encoding=encoding, errors=errors)
     return p.open(mode, encoding=encoding, errors=errors)
@@ -159,101 +175,235 @@ def _round_money(tx: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-def parse_logs(log_dir: str | Path) -> List[Dict[str, Any]]:
+def _block_end(data: Buffer, pos: int) -> int:
+    """
+    Return the end offset of the last line of a block whose opening line (holding
+    the first ``{``) ends just before ``pos``. Only braces and newlines are visited;
+    the block closes at the first line end where the brace depth reaches zero.
+    """
+    depth = 1
+    for m in BLOCK_SCAN_RE.finditer(data, pos):
+        tok = m.group()
+        if tok == b"{":
+            depth += 1
+        elif tok == b"}":
+            depth -= 1
+        elif depth <= 0:
+            return m.start()
+    return len(data)
+
+
+def _decode(raw: bytes) -> str:
+    # Match text-mode reading: lenient UTF-8 and universal newlines
+    return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n")
+
+
+class _EventColumns:
+    """
+    Column-wise event accumulator: one list per field instead of one dict per event.
+    Fields an event does not carry are padded with NaN, as DataFrame construction
+    from a list of dicts would do. Each event also records the id of its key order
+    (``signature_ids``), so the frame's column order can be derived from the events
+    themselves rather than from the order files were parsed in.
+    """
+
+    def __init__(self) -> None:
+        self.columns: Dict[str, List[Any]] = {"timestamp": [], "messageId": [], "eventType": []}
+        self.size = 0
+        self.signatures: Dict[Tuple[str, ...], int] = {}
+        self.signature_ids: List[int] = []
+
+    def _signature_id(self, keys: Tuple[str, ...]) -> int:
+        sig_id = self.signatures.get(keys)
+        if sig_id is None:
+            sig_id = self.signatures[keys] = len(self.signatures)
+        return sig_id
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.signature_ids.append(self._signature_id(tuple(row)))
+        for key, value in row.items():
+            col = self.columns.get(key)
+            if col is None:
+                col = self.columns[key] = [np.nan] * self.size
+            col.append(value)
+        self.size += 1
+        if len(row) < len(self.columns):
+            for col in self.columns.values():
+                if len(col) < self.size:
+                    col.append(np.nan)
+
+    def extend(self, other: "_EventColumns") -> None:
+        for key in other.columns:
+            if key not in self.columns:
+                self.columns[key] = [np.nan] * self.size
+        for key, col in self.columns.items():
+            col.extend(other.columns.get(key) or [np.nan] * other.size)
+        self.size += other.size
+        remap = [self._signature_id(keys) for keys in other.signatures]
+        self.signature_ids.extend(remap[sig_id] for sig_id in other.signature_ids)
+
+    def column_order(self, order: np.ndarray) -> List[str]:
+        """
+        Columns in order of first appearance when the events are taken in ``order``, with
+        ``currency`` following an event's own keys when it lacks one (it is defaulted
+        for every event). Matches building the frame from the sorted event dicts.
+        """
+        sig_ids = np.asarray(self.signature_ids, dtype=np.int64)[order]
+        _, first_pos = np.unique(sig_ids, return_index=True)
+        by_key_order = {sig_id: keys for keys, sig_id in self.signatures.items()}
+        columns: Dict[str, None] = {}
+        for sig_id in sig_ids[np.sort(first_pos)].tolist():
+            columns.update(dict.fromkeys(by_key_order[sig_id] + ("currency",)))
+        return list(columns)
+
+
+def _scan_events(data: Buffer) -> _EventColumns:
+    """
+    Extract skip and balance sync events from the raw bytes of one log file.
+
+    Only lines containing one of the event markers are decoded and inspected; a
+    balance sync block consumes the lines up to its closing brace, so markers
+    inside a block are not treated as separate events.
+    """
+    events = _EventColumns()
+    last_msg_id: Optional[str] = None
+    pos = 0
+    while True:
+        hint = EVENT_HINT_RE.search(data, pos)
+        if not hint:
+            break
+        line_start = data.rfind(b"\n", 0, hint.start()) + 1
+        line_end = data.find(b"\n", hint.end())
+        if line_end == -1:
+            line_end = len(data)
+        line = _decode(data[line_start:line_end])
+        if line.endswith("\r"):
+            line = line[:-1]
+        pos = line_end + 1
+
+        ts_match = TS_RE.match(line)
+        ts = parse_iso(ts_match.group("ts")) if ts_match else None
+
+        # Track message id context if near
+        mmsg = PROC_MSG_RE.search(line)
+        if mmsg:
+            last_msg_id = mmsg.group("msgid")
+
+        if SKIP_RE.search(line):
+            # Represent as a 'skip' event for completeness
+            events.append({
+                "timestamp": ts,
+                "messageId": last_msg_id,
+                "eventType": "SKIP_CREATE_SUBSCRIPTION",
+                "raw": line
+            })
+            continue
+
+        if BLOCK_START_RE.search(line):
+            # Collect until closing brace of the top-level block
+            block_end = _block_end(data, pos)
+            tx = parse_transaction_block(_decode(data[line_start:block_end]))
+            if tx:
+                events.append({
+                    "timestamp": ts,
+                    "messageId": last_msg_id,
+                    "eventType": "BALANCE_SYNC",
+                    **tx
+                })
+            pos = block_end + 1
+    return events
+
+
+def _parse_one_file(path: Path) -> _EventColumns:
+    """
+    Parse a single (optionally gzipped) log file into events. Plain files are
+    memory-mapped and scanned in place; gzip content is decompressed to bytes.
+    Runs in a worker process, so it must stay a module-level function.
+    """
+    try:
+        fh = path.open("rb")
+    except Exception as exc:
+        logger.warning(f"Failed to open {path}: {exc}")
+        return _EventColumns()
+    with fh:
+        if fh.read(2) == GZIP_MAGIC:
+            fh.seek(0)
+            with gzip.GzipFile(fileobj=fh) as gz:
+                data = gz.read()
+            logger.debug(f"Read {len(data)} bytes from {path}")
+            return _scan_events(data)
+        size = os.fstat(fh.fileno()).st_size
+        logger.debug(f"Mapping {size} bytes from {path}")
+        if size == 0:
+            return _EventColumns()
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _scan_events(mm)
+
+
+def parse_logs(log_dir: str | Path, *, max_workers: Optional[int] = None) -> pd.DataFrame:
     """
     Recursively scan ``log_dir`` for candidate log files (.log, .txt or gzip),
-    parse each and return a list of event dictionaries ordered by user and
-    timestamp. Supports both plain text and gzip-compressed files, even if
-    they lack a .gz extension.
+    parse each and return a frame of events, one row per event, ordered by user
+    and timestamp. Supports both plain text and gzip-compressed files, even if
+    they lack a .gz extension. Files are parsed in parallel worker processes.
 
     Parameters
     ----------
     log_dir: str or Path
         Directory containing log files. Will be resolved to an absolute Path.
+    max_workers: int or None
+        Number of worker processes. None uses one per CPU; 1 parses in-process.
 
     Returns
     -------
-    List[Dict[str, Any]]
+    pd.DataFrame
         Parsed events in chronological order by userId and timestamp.
     """
     log_dir_path = Path(log_dir).expanduser().resolve()
     logger.info(f"Scanning log directory: {log_dir_path}")
-    events: List[Dict[str, Any]] = []
+    paths: List[Path] = []
     for root, _, files in os.walk(log_dir_path):
         for fn in files:
             # Only consider known log file extensions; gzipped files without extension
-            if not fn.lower().endswith((".log", ".txt", ".gz")):
-                continue
-            path = Path(root) / fn
-            try:
-                f = open_maybe_gz(path, "rt", encoding="utf-8", errors="ignore")
-            except Exception as exc:
-                logger.warning(f"Failed to open {path}: {exc}")
-                continue
-            with f:
-                buf = f.read().splitlines()
-            logger.debug(f"Read {len(buf)} lines from {path}")
-
-            i = 0
-            last_msg_id: Optional[str] = None
-            while i < len(buf):
-                line = buf[i]
-                ts_match = TS_RE.match(line)
-                ts = parse_iso(ts_match.group("ts")) if ts_match else None
-
-                # Track message id context if near
-                mmsg = PROC_MSG_RE.search(line)
-                if mmsg:
-                    last_msg_id = mmsg.group("msgid")
-
-                if SKIP_RE.search(line):
-                    # Represent as a 'skip' event for completeness
-                    events.append({
-                        "timestamp": ts,
-                        "messageId": last_msg_id,
-                        "eventType": "SKIP_CREATE_SUBSCRIPTION",
-                        "raw": line
-                    })
-                    i += 1
-                    continue
-
-                if BLOCK_START_RE.search(line):
-                    # Collect until closing brace of the top-level block
-                    block_lines = [line]
-                    j = i + 1
-                    brace_depth = 1
-                    while j < len(buf) and brace_depth > 0:
-                        block_lines.append(buf[j])
-                        brace_depth += buf[j].count("{")
-                        brace_depth -= buf[j].count("}")
-                        j += 1
-                    tx = parse_transaction_block(block_lines)
-                    if tx:
-                        events.append({
-                            "timestamp": ts,
-                            "messageId": last_msg_id,
-                            "eventType": "BALANCE_SYNC",
-                            **tx
-                        })
-                    i = j
-                    continue
-
-                i += 1
+            if fn.lower().endswith((".log", ".txt", ".gz")):
+                paths.append(Path(root) / fn)
+
+    if len(paths) <= 1 or max_workers == 1:
+        results = [_parse_one_file(p) for p in paths]
+    else:
+        # One task per file: files are coarse units of work, so batching them would only
+        # leave workers idle when there are few files
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            results = list(ex.map(_parse_one_file, paths))
+    collected = _EventColumns()
+    for part in results:
+        collected.extend(part)
+    if not collected.size:
+        logger.info(f"Parsed 0 events from {log_dir_path}")
+        return pd.DataFrame()
+    events = pd.DataFrame(collected.columns)
+    events["timestamp"] = pd.to_datetime(events["timestamp"], utc=True)
 
     # Normalize types & defaults
-    for e in events:
-        if e.get("currency") is None:
-            e["currency"] = "UNKNOWN"
-        if "type" in e and e["type"] is not None:
-            e["type"] = str(e["type"]).upper()
-        if "source" in e and e["source"] is not None:
-            e["source"] = str(e["source"]).upper()
-    # sort deterministically by user, timestamp, id and messageId
-    events.sort(key=lambda x: (
-        x.get("userId", ""),
-        x.get("timestamp") or datetime.min.replace(tzinfo=timezone.utc),
-        str(x.get("id", "")),
-        str(x.get("messageId", ""))
-    ))
+    events["currency"] = events["currency"].fillna("UNKNOWN") if "currency" in events else "UNKNOWN"
+    for col in ("type", "source"):
+        if col in events:
+            present = events[col].notna()
+            events.loc[present, col] = events.loc[present, col].astype(str).str.upper()
+
+    # sort deterministically by user, timestamp, id and messageId (lexsort is stable;
+    # the last key is the primary one). Missing timestamps (NaT) sort first.
+    def sort_key(col: str) -> np.ndarray:
+        if col not in events:
+            return np.full(len(events), "")
+        return events[col].where(events[col].notna(), "").astype(str).to_numpy()
+
+    stamps = events["timestamp"].to_numpy(dtype="datetime64[ns]").view("i8")
+    order = np.lexsort((sort_key("messageId"), sort_key("id"), stamps, sort_key("userId")))
+    # Rows and columns are reordered in one take; columns follow their first appearance
+    # in the sorted events, independent of the order the files were listed and parsed in
+    col_positions = events.columns.get_indexer(collected.column_order(order))
+    events = events.iloc[order, col_positions]
+    events.index = pd.RangeIndex(len(events))
     logger.info(f"Parsed {len(events)} events from {log_dir_path}")
     return events
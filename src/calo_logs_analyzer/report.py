@@ -1,14 +1,14 @@
 import json
 import logging
 import tempfile
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-from jinja2 import Environment, FileSystemLoader
-from plotly.offline import plot
 
 from src.calo_logs_analyzer.anomalies import detect_anomalies
 from src.calo_logs_analyzer.compute import build_ledger, build_reconciliation, summarize
@@ -16,6 +16,86 @@ from src.calo_logs_analyzer.parser import parse_logs
 
 logger = logging.getLogger(__name__)
 
+# Low-cardinality ledger columns held as categoricals so groupbys hash integer codes and
+# each repeated string is stored once
+CATEGORICAL_COLUMNS = ("type", "source", "userId", "action", "overdraftReason", "currency", "eventType")
+
+# Excel sheet limits (rows include the header row)
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_COLS = 16_384
+
+# Total sheet rows from which the workbook is written in xlsxwriter's constant_memory mode.
+# Below it the default shared string table is faster and gives smaller files.
+CONSTANT_MEMORY_MIN_ROWS = 250_000
+
+# Ledger sheet columns for the 'accounting' Excel preset
+_ACCOUNTING_COLUMNS = (
+    "timestamp",
+    "userId",
+    "id",
+    "type",
+    "source",
+    "action",
+    "oldBalance",
+    "amount",
+    "newBalance",
+    "expectedNewBalance",
+    "balanceMismatch",
+    "continuityBreak",
+    "overdraft",
+    "overdraftReason",
+    "suggestedAdjustment",
+)
+
+# Sample tables in the HTML report: ledger column -> display label
+OVERDRAFT_TABLE_COLUMNS = {
+    "timestamp": "Timestamp", "userId": "User", "id": "Tx ID", "amount": "Amount",
+    "oldBalance": "Old Balance", "newBalance": "Overdraft",
+}
+MISMATCH_TABLE_COLUMNS = {
+    "timestamp": "Timestamp", "userId": "User", "id": "Tx ID", "oldBalance": "Old", "amount": "Amount",
+    "expectedNewBalance": "Expected New", "newBalance": "Actual New", "suggestedAdjustment": "Suggested Adjustment",
+}
+ANOMALY_TABLE_COLUMNS = {
+    "timestamp": "Timestamp", "userId": "User", "id": "Tx ID", "type": "Type", "source": "Source",
+    "action": "Action", "amount": "Amount", "oldBalance": "Old Balance", "newBalance": "New Balance",
+    "anomalyType": "Flags", "details": "Description",
+}
+
+# Templates live at the project root (two parents up)
+TEMPLATES_DIR = Path(__file__).resolve().parents[2] / "templates"
+
+
+# plotly and jinja2 are only needed for the HTML report and take a large share of this
+# module's import time (plotly.offline pulls in IPython), so they are imported on first use.
+@lru_cache(maxsize=1)
+def _plotly() -> Tuple[Any, Any, str]:
+    """
+    Return ``(plotly.graph_objs, plotly.io, plotlyjs_src)``, where ``plotlyjs_src`` is the
+    CDN URL of the plotly.js bundle matching the installed plotly.
+    """
+    import plotly.graph_objs as go
+    import plotly.io as pio
+    from plotly.offline import get_plotlyjs_version
+
+    return go, pio, f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+@lru_cache(maxsize=1)
+def _report_template():
+    """
+    Compiled report template, loaded on first use. Templates are shipped with the code,
+    so they are compiled once per process and never re-checked on disk.
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    env = Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        autoescape=select_autoescape(("html", "html.j2")),
+        auto_reload=False,
+    )
+    return env.get_template("report.html.j2")
+
 
 def _ensure_out(out_dir: str | Path) -> Path:
     """
@@ -37,33 +117,116 @@ def _ensure_out(out_dir: str | Path) -> Path:
         return fallback
 
 
-def _naive_utc(df: pd.DataFrame) -> pd.DataFrame:
-    """Make tz-aware datetime columns Excel-safe (UTC -> naive)."""
-    if df is None or df.empty:
-        return df
-    out = df.copy()
-    for c in out.select_dtypes(include=["datetimetz"]).columns:
-        out[c] = out[c].dt.tz_convert("UTC").dt.tz_localize(None)
-    return out
+def _flag_rows(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Positions of the rows where a flag column is True, empty when the column is absent."""
+    if col not in df.columns:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(df[col].to_numpy(dtype=bool, na_value=False))
+
+
+def _excel_value(val: Any) -> Any:
+    """Convert an object-column value the way pandas' to_excel does (None for an empty cell)."""
+    if pd.api.types.is_scalar(val) and pd.isna(val):
+        return None
+    if isinstance(val, (bool, np.bool_)):
+        return bool(val)
+    if isinstance(val, (int, float, np.integer, np.floating)):
+        if np.isinf(val):
+            return "inf" if val > 0 else "-inf"
+        return val.item() if isinstance(val, np.generic) else val
+    if isinstance(val, (datetime, date, str)):
+        return val
+    return str(val)
+
+
+def _fast_write_sheet(xl: pd.ExcelWriter, name: str, df: pd.DataFrame) -> None:
+    """
+    Write ``df`` to a new sheet through the xlsxwriter worksheet API, row by row.
+
+    Produces the same cells as ``df.to_excel(xl, sheet_name=name, index=False)`` (bold header,
+    NaN/NaT left empty, infinities as ``inf`` text, tz-aware datetimes as naive UTC) without
+    pandas' per-cell ExcelCell objects and style lookups. Values are converted and a write
+    method picked once per column; rows are emitted in order, as constant_memory requires.
+
+    Raises
+    ------
+    ValueError
+        If ``df`` plus its header row does not fit on an Excel sheet. xlsxwriter would
+        otherwise drop the overflowing cells without an error.
+    """
+    num_rows, num_cols = df.shape
+    if num_rows + 1 > EXCEL_MAX_ROWS or num_cols > EXCEL_MAX_COLS:
+        raise ValueError(
+            f"This sheet is too large! Your sheet size is: {num_rows}, {num_cols} "
+            f"Max sheet size is: {EXCEL_MAX_ROWS - 1}, {EXCEL_MAX_COLS}"
+        )
+    book = xl.book
+    ws = book.add_worksheet(name)
+    header_fmt = book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    datetime_fmt = book.add_format({"num_format": xl.datetime_format or "YYYY-MM-DD HH:MM:SS"})
+    date_fmt = book.add_format({"num_format": xl.date_format or "YYYY-MM-DD"})
+
+    def write_object(row: int, col: int, val: Any, _fmt: Any) -> None:
+        if isinstance(val, datetime):
+            ws.write_datetime(row, col, val, datetime_fmt)
+        elif isinstance(val, date):
+            ws.write_datetime(row, col, val, date_fmt)
+        else:
+            ws.write(row, col, val)
+
+    # (write method, values with None for empty cells, cell format) per column
+    writers = []
+    for col, name_ in enumerate(df.columns):
+        ws.write(0, col, str(name_), header_fmt)
+        series = df.iloc[:, col]
+        dtype = series.dtype
+        if isinstance(dtype, pd.DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind == "M"):
+            if isinstance(dtype, pd.DatetimeTZDtype):
+                series = series.dt.tz_convert(None)
+            values = series.array.to_pydatetime().astype(object)
+            values[series.isna().to_numpy()] = None
+            writers.append((ws.write_datetime, values.tolist(), datetime_fmt))
+        elif isinstance(dtype, np.dtype) and dtype.kind == "b":
+            writers.append((ws.write_boolean, series.to_numpy().tolist(), None))
+        elif isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            arr = series.to_numpy()
+            values = arr.astype(object)
+            values[np.isnan(arr) if dtype.kind == "f" else np.zeros(len(arr), dtype=bool)] = None
+            inf = np.isinf(arr)
+            if inf.any():
+                values[inf] = np.where(arr[inf] > 0, "inf", "-inf")
+                writers.append((ws.write, values.tolist(), None))
+            else:
+                writers.append((ws.write_number, values.tolist(), None))
+        else:
+            writers.append((write_object, [_excel_value(v) for v in series.tolist()], None))
+
+    for row in range(len(df)):
+        cell_row = row + 1
+        for col, (write, values, fmt) in enumerate(writers):
+            val = values[row]
+            if val is not None:
+                write(cell_row, col, val, fmt)
 
 
 def _write_excel(
-        out_dir: Path,
+        xlsx_path: Path,
         ledger: pd.DataFrame,
         recon: pd.DataFrame,
         anomalies: pd.DataFrame,
         summary: Dict[str, Any],
         *,
         ledger_columns: Optional[List[str]] = None,
-        run_ts
+        overdraft_rows: Optional[np.ndarray] = None,
+        constant_memory: Optional[bool] = None
 ) -> str:
     """
-    Write the report.xlsx file with multiple sheets. Optionally filter columns for the Ledger sheet.
+    Write the Excel report with multiple sheets. Optionally filter columns for the Ledger sheet.
 
     Parameters
     ----------
-    out_dir : Path
-        Output directory.
+    xlsx_path : Path
+        Destination of the workbook.
     ledger : DataFrame
         Full ledger.
     recon : DataFrame
@@ -74,23 +237,30 @@ def _write_excel(
         Summary dict from summarize().
     ledger_columns : list or None
         Columns to include for the Ledger sheet. If None, all columns are written.
+    overdraft_rows : ndarray of int or None
+        Positions of the ``ledger`` rows flagged as overdrafts. Computed from ``ledger`` when None.
+    constant_memory : bool or None
+        Write in xlsxwriter's constant_memory mode, which keeps only the current row and
+        stores strings inline: peak memory stays flat, but the write is slower and the file
+        larger. If None, it is used once the sheets total ``CONSTANT_MEMORY_MIN_ROWS`` rows.
 
     Returns
     -------
     str
         Path to the written Excel file.
     """
-    out_path = out_dir / f"report_{run_ts}.xlsx" if run_ts else "report.xlsx"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    xlsx_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Filter ledger columns if specified
-    ledger_sheet = ledger.copy()
+    # Filter ledger columns if specified; the sheets are only read, so no copies are taken
+    ledger_sheet = ledger
     if ledger_columns is not None:
-        cols = [c for c in ledger_columns if c in ledger_sheet.columns]
-        ledger_sheet = ledger_sheet[cols].copy()
+        cols = [c for c in ledger_columns if c in ledger.columns]
+        ledger_sheet = ledger[cols]
 
     # Overdrafts sheet: subset where overdraft is True
-    overdrafts_sheet = ledger[ledger.get("overdraft", False) == True].copy()
+    if overdraft_rows is None:
+        overdraft_rows = _flag_rows(ledger, "overdraft")
+    overdrafts_sheet = ledger.take(overdraft_rows)
 
     sheets = {
         "Ledger": ledger_sheet,
@@ -101,93 +271,170 @@ def _write_excel(
         "Anomalies": anomalies,
     }
 
-    with pd.ExcelWriter(out_path, engine="openpyxl") as xl:
+    if constant_memory is None:
+        constant_memory = sum(len(df_) for df_ in sheets.values()) >= CONSTANT_MEMORY_MIN_ROWS
+        if constant_memory:
+            logger.info(f"Writing {xlsx_path} in constant_memory mode")
+
+    # xlsxwriter streams cells straight to the zip instead of building an openpyxl object tree.
+    # _fast_write_sheet emits rows in order, so the same writer serves both modes. Strings are
+    # written as-is, never as formulas or links.
+    engine_kwargs = {"options": {"constant_memory": constant_memory,
+                                 "strings_to_formulas": False, "strings_to_urls": False}}
+    with pd.ExcelWriter(xlsx_path, engine="xlsxwriter", engine_kwargs=engine_kwargs) as xl:
         for name, df_ in sheets.items():
-            _naive_utc(df_).to_excel(xl, sheet_name=name, index=False)
+            _fast_write_sheet(xl, name, df_)
 
-    return str(out_path)
+    return str(xlsx_path)
 
 
-def _fig_total_by_type(ledger: pd.DataFrame):
-    agg = ledger.groupby("type")["amount"].sum().reset_index()
-    return go.Figure([go.Bar(x=agg["type"], y=agg["amount"])]).update_layout(title="Total Amount by Type")
-
+def _compute_chart_frames(ledger: pd.DataFrame, overdraft_rows: np.ndarray) -> Dict[str, pd.Series]:
+    """
+    Aggregate everything the report charts need in one go, so the helpers below only see
+    small pre-aggregated series instead of re-scanning the ledger.
 
-def _fig_top_overdrafts(ledger: pd.DataFrame):
-    od = ledger[ledger["overdraft"] == True]
-    if od.empty:
+    Returns
+    -------
+    dict
+        ``by_type`` (amount per type), ``top_overdrafts`` (ten largest overdraft amount
+        sums per user) and ``daily_net`` (credit minus debit per UTC day).
+    """
+    if ledger.empty:
+        empty = pd.Series(dtype=float)
+        return {"by_type": empty, "top_overdrafts": empty, "daily_net": empty}
+
+    # Group the amount column alone by key arrays; no ledger-wide frame is sliced or copied
+    amounts, types = ledger["amount"], ledger["type"]
+    by_type = amounts.groupby(types, observed=True).sum()
+    top_overdrafts = (amounts.take(overdraft_rows).groupby(ledger["userId"].take(overdraft_rows), observed=True)
+                      .sum().nlargest(10))
+
+    # Truncate the UTC instants to whole days on the raw datetime64 values; missing types
+    # are kept as their own column so every day with activity gets a point
+    days = ledger["timestamp"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    daily = (amounts.groupby([types, days], observed=True, dropna=False).sum()
+             .unstack("type", fill_value=0))
+    zero = pd.Series(0.0, index=daily.index)
+    daily_net = (daily.get("CREDIT", zero) - daily.get("DEBIT", zero)).sort_index()
+    return {"by_type": by_type, "top_overdrafts": top_overdrafts, "daily_net": daily_net}
+
+
+def _fig_total_by_type(by_type: pd.Series):
+    go, _, _ = _plotly()
+    return go.Figure([go.Bar(x=by_type.index.to_numpy(), y=by_type.to_numpy())]).update_layout(
+        title="Total Amount by Type")
+
+
+def _fig_top_overdrafts(top_overdrafts: pd.Series):
+    go, _, _ = _plotly()
+    if top_overdrafts.empty:
         return go.Figure().update_layout(title="Top Overdraft Users (none)")
-    agg = od.groupby("userId")["amount"].sum().reset_index().sort_values("amount", ascending=False).head(10)
-    return go.Figure([go.Bar(x=agg["userId"], y=agg["amount"])]).update_layout(
+    return go.Figure([go.Bar(x=top_overdrafts.index.to_numpy(), y=top_overdrafts.to_numpy())]).update_layout(
         title="Top Overdraft Users (sum of amounts)")
 
 
-def _fig_flow_over_time(ledger: pd.DataFrame):
-    df = ledger.copy()
-    if df.empty:
+def _fig_flow_over_time(daily_net: pd.Series):
+    go, _, _ = _plotly()
+    if daily_net.empty:
         return go.Figure().update_layout(title="Daily Net Flow (none)")
-    df["date"] = pd.to_datetime(df["timestamp"]).dt.date
-    credits = df[df["type"] == "CREDIT"].groupby("date")["amount"].sum()
-    debits = df[df["type"] == "DEBIT"].groupby("date")["amount"].sum()
-    net = credits.reindex(sorted(set(df["date"])), fill_value=0) - debits.reindex(sorted(set(df["date"])), fill_value=0)
-    return go.Figure([go.Scatter(x=list(net.index), y=list(net.values), mode="lines+markers")]).update_layout(
+    days = np.datetime_as_string(daily_net.index.to_numpy(), unit="D")
+    return go.Figure([go.Scatter(x=list(days), y=list(daily_net.values), mode="lines+markers")]).update_layout(
         title="Daily Net Flow (Credit - Debit)")
 
 
+def _html_table(df: pd.DataFrame, columns: Dict[str, str]) -> str:
+    """
+    Render sample rows as an HTML table in one to_html pass.
+
+    ``columns`` maps ledger column names to their display labels; missing columns and
+    values (NaN and NaT alike) are shown empty. Floats keep their own precision (``str``)
+    instead of being padded to a common number of decimals per column. Cell values are
+    HTML-escaped.
+    """
+    table = df.reindex(columns=list(columns)).rename(columns=columns)
+    # na_rep does not reach NaT in datetime columns or None in object columns; render
+    # those columns as text with missing values already blank
+    for label, dtype in table.dtypes.items():
+        if dtype == object or pd.api.types.is_datetime64_any_dtype(dtype):
+            col = table[label]
+            table[label] = col.map(str).where(col.notna(), "")
+    return table.to_html(index=False, classes="tbl", border=0, escape=True, float_format=str, na_rep="")
+
+
 def _render_html(
-        out_dir: Path,
+        html_path: Path,
         ledger: pd.DataFrame,
         recon: pd.DataFrame,
         anomalies: pd.DataFrame,
         summary: Dict[str, Any],
-        run_ts
+        overdraft_rows: Optional[np.ndarray] = None,
+        mismatch_rows: Optional[np.ndarray] = None
 ) -> str:
     """
-    Render the HTML report using Jinja2 and Plotly charts.
+    Render the HTML report to ``html_path`` using Jinja2 and Plotly charts.
+
+    ``overdraft_rows`` and ``mismatch_rows`` are the positions of the flagged ledger rows,
+    computed from ``ledger`` when not given.
     """
-    # Locate templates relative to project root (two parents up)
-    base_dir = Path(__file__).resolve().parents[2]
-    templates_dir = base_dir / "templates"
-    env = Environment(loader=FileSystemLoader(str(templates_dir)))
-    tmpl = env.get_template("report.html.j2")
-
-    # Charts to HTML
-    fig1 = _fig_total_by_type(ledger)
-    fig2 = _fig_top_overdrafts(ledger)
-    fig3 = _fig_flow_over_time(ledger)
-
-    fig1_div = plot(fig1, include_plotlyjs="cdn", output_type="div")
-    fig2_div = plot(fig2, include_plotlyjs=False, output_type="div")
-    fig3_div = plot(fig3, include_plotlyjs=False, output_type="div")
-
-    # Prepare samples
-    overdrafts_df = ledger[ledger.get("overdraft", False) == True]
-    top_overdrafts = overdrafts_df[[
-        "timestamp", "userId", "id", "amount", "oldBalance", "newBalance"
-    ]].sort_values("amount", ascending=False).head(20).to_dict(orient="records")
-
-    mismatches_df = ledger[ledger.get("balanceMismatch", False) == True]
-    top_mismatches = mismatches_df[[
-        "timestamp", "userId", "id", "oldBalance", "amount", "expectedNewBalance",
-        "newBalance", "suggestedAdjustment"
-    ]].head(20).to_dict(orient="records")
-
-    anomaly_records = anomalies.sort_values("timestamp", ascending=False).head(50).to_dict(
-        orient="records") if not anomalies.empty else []
+    tmpl = _report_template()
+
+    if overdraft_rows is None:
+        overdraft_rows = _flag_rows(ledger, "overdraft")
+    if mismatch_rows is None:
+        mismatch_rows = _flag_rows(ledger, "balanceMismatch")
+
+    # Charts as figure JSON; plotly.js draws them in the browser
+    chart_frames = _compute_chart_frames(ledger, overdraft_rows)
+    fig1 = _fig_total_by_type(chart_frames["by_type"])
+    fig2 = _fig_top_overdrafts(chart_frames["top_overdrafts"])
+    fig3 = _fig_flow_over_time(chart_frames["daily_net"])
+
+    # The figures were validated when built, so serialization skips the second pass
+    _, pio, plotlyjs_src = _plotly()
+    fig1_json = pio.to_json(fig1, validate=False)
+    fig2_json = pio.to_json(fig2, validate=False)
+    fig3_json = pio.to_json(fig3, validate=False)
+
+    # Prepare samples; only the sampled rows are taken from the ledger, and nlargest picks
+    # them without sorting the whole subset
+    top_rows = pd.Series(ledger["amount"].to_numpy()[overdraft_rows]).nlargest(20).index.to_numpy()
+    overdrafts_table = _html_table(ledger.take(overdraft_rows[top_rows]), OVERDRAFT_TABLE_COLUMNS)
+
+    mismatches_table = (_html_table(ledger.take(mismatch_rows[:20]), MISMATCH_TABLE_COLUMNS)
+                        if len(mismatch_rows) else None)
+
+    anomaly_rows = anomalies.nlargest(50, "timestamp") if not anomalies.empty else anomalies
+    anomalies_table = _html_table(anomaly_rows, ANOMALY_TABLE_COLUMNS)
 
     html = tmpl.render(
         totals=summary["totals"],
-        fig1=fig1_div,
-        fig2=fig2_div,
-        fig3=fig3_div,
-        top_overdrafts=top_overdrafts,
-        top_mismatches=top_mismatches,
-        anomalies=anomaly_records,
+        plotlyjs_src=plotlyjs_src,
+        fig1=fig1_json,
+        fig2=fig2_json,
+        fig3=fig3_json,
+        overdrafts_table=overdrafts_table,
+        mismatches_table=mismatches_table,
+        anomalies_table=anomalies_table,
     )
-    out_path = out_dir / f"report_{run_ts}.html" if run_ts else "report.html"
-    with out_path.open("w", encoding="utf-8") as f:
+    with html_path.open("w", encoding="utf-8") as f:
         f.write(html)
-    return str(out_path)
+    return str(html_path)
+
+
+@lru_cache(maxsize=16)
+def _read_column_preset(path: str, mtime_ns: int) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a JSON column preset. ``mtime_ns`` only takes part in the cache key, so an
+    edited file is read again.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return tuple(str(c) for c in data)
+    except Exception as exc:
+        logger.warning(f"Could not load Excel columns preset from {path}: {exc}")
+    return None
 
 
 def _load_column_preset(preset: str | Path | None) -> Optional[List[str]]:
@@ -212,32 +459,15 @@ def _load_column_preset(preset: str | Path | None) -> Optional[List[str]]:
         if preset.lower() == "full":
             return None
         if preset.lower() == "accounting":
-            return [
-                "timestamp",
-                "userId",
-                "id",
-                "type",
-                "source",
-                "action",
-                "oldBalance",
-                "amount",
-                "newBalance",
-                "expectedNewBalance",
-                "balanceMismatch",
-                "continuityBreak",
-                "overdraft",
-                "overdraftReason",
-                "suggestedAdjustment",
-            ]
+            return list(_ACCOUNTING_COLUMNS)
+    preset_path = Path(preset).expanduser()
     try:
-        preset_path = Path(preset).expanduser()
-        with preset_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return [str(c) for c in data]
-    except Exception as exc:
+        mtime_ns = preset_path.stat().st_mtime_ns
+    except OSError as exc:
         logger.warning(f"Could not load Excel columns preset from {preset}: {exc}")
-    return None
+        return None
+    columns = _read_column_preset(str(preset_path), mtime_ns)
+    return list(columns) if columns is not None else None
 
 
 def run_analysis(
@@ -248,7 +478,8 @@ def run_analysis(
         log_level: str = "INFO",
         tolerance: float = 0.005,
         decimals: int = 2,
-        excel_columns: Optional[str] = None
+        excel_columns: Optional[str] = None,
+        excel_constant_memory: Optional[bool] = None
 ):
     """
     High-level orchestration for parsing logs, building the ledger, detecting anomalies,
@@ -263,6 +494,11 @@ def run_analysis(
     events = parse_logs(log_dir)
     logger.info(f"Building ledger from {len(events)} events")
     ledger = build_ledger(events, decimals=decimals, tolerance=tolerance)
+    if "timestamp" in ledger.columns and not pd.api.types.is_datetime64_any_dtype(ledger["timestamp"]):
+        ledger["timestamp"] = pd.to_datetime(ledger["timestamp"], utc=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in ledger.columns:
+            ledger[col] = ledger[col].astype("category")
     logger.info(f"Ledger contains {len(ledger)} balance transactions")
     recon = build_reconciliation(ledger)
     anomalies = detect_anomalies(ledger, mad_threshold=6.0, dup_time_window=60.0)
@@ -274,13 +510,25 @@ def run_analysis(
         logger.info(f"Wrote raw parsed CSV to {raw_path}")
 
     columns_list = _load_column_preset(excel_columns)
-    xlsx_path = _write_excel(out_path, ledger, recon, anomalies, summary, ledger_columns=columns_list, run_ts=run_ts)
-    html_path = _render_html(out_path, ledger, recon, anomalies, summary, run_ts=run_ts)
+    overdraft_rows = _flag_rows(ledger, "overdraft")
+    mismatch_rows = _flag_rows(ledger, "balanceMismatch")
+    xlsx_path = out_path / f"report_{run_ts}.xlsx"
+    html_path = out_path / f"report_{run_ts}.html"
+    # The writers only read the frames; run them side by side so the HTML rendering
+    # overlaps the workbook's zlib compression, which releases the GIL
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        xlsx_future = pool.submit(_write_excel, xlsx_path, ledger, recon, anomalies, summary,
+                                  ledger_columns=columns_list, overdraft_rows=overdraft_rows,
+                                  constant_memory=excel_constant_memory)
+        html_future = pool.submit(_render_html, html_path, ledger, recon, anomalies, summary,
+                                  overdraft_rows=overdraft_rows, mismatch_rows=mismatch_rows)
+        xlsx_future.result()
+        html_future.result()
 
     logger.info(f"Exported report: {html_path}")
     logger.info(f"Exported Excel: {xlsx_path}")
 
-    return {"html": html_path, "xlsx": xlsx_path}
+    return {"html": str(html_path), "xlsx": str(xlsx_path)}
 
 
 if __name__ == "__main___":
@@ -0,0 +1,54 @@
+import unittest
+
+import pandas as pd
+
+from src.calo_logs_analyzer.compute import build_ledger
+
+
+def _sync(tx_id: str, day: int, old: float, new: float, currency: str = "SAR") -> dict:
+    return {
+        "eventType": "BALANCE_SYNC",
+        "userId": "u1",
+        "timestamp": pd.Timestamp("2024-01-01") + pd.Timedelta(days=day),
+        "id": tx_id,
+        "messageId": tx_id,
+        "type": "CREDIT",
+        "currency": currency,
+        "amount": 0.0,
+        "vat": 0.0,
+        "oldBalance": old,
+        "newBalance": new,
+    }
+
+
+class ContinuityBreakTest(unittest.TestCase):
+    def test_gap_equal_to_tolerance_at_large_balance(self):
+        # 38602200.005 - 38602200.0 is 0.005000003 in floats
+        ledger = build_ledger([
+            _sync("a", 0, 38602200.0, 38602200.0),
+            _sync("b", 1, 38602200.005, 38602200.005),
+        ])
+        self.assertEqual(ledger["continuityBreak"].tolist(), [False, False])
+
+    def test_gap_above_tolerance_at_large_balance(self):
+        ledger = build_ledger([
+            _sync("a", 0, 987654321.1234, 987654321.1234, "BHD"),
+            _sync("b", 1, 987654321.1285, 987654321.1285, "BHD"),
+        ])
+        self.assertEqual(ledger["continuityBreak"].tolist(), [False, True])
+
+
+class IntegerRangeTest(unittest.TestCase):
+    def test_amount_beyond_int64_units_is_rejected(self):
+        row = dict(_sync("a", 0, 0.0, 2e13), amount=2e13)
+        with self.assertRaises(ValueError):
+            build_ledger([row])
+
+    def test_expected_balance_beyond_int64_units_is_rejected(self):
+        row = dict(_sync("a", 0, 5e12, 9e12), amount=5e12)
+        with self.assertRaises(ValueError):
+            build_ledger([row])
+
+
+if __name__ == "__main__":
+    unittest.main()